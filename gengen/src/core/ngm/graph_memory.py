@@ -7,47 +7,134 @@ long-term context retention, associative recall, and 90%+ token cost reduction
 compared to traditional RAG systems.
 """
 
+import math
+import time
+
 import numpy as np
 import networkx as nx
 from typing import Dict, List, Optional, Tuple, Any
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from datetime import datetime
-import pickle
+from operator import itemgetter
+import json
 import faiss
 from loguru import logger
 
+try:
+    from numba import njit, prange
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
+# Retrieval scoring weights: combined score mixes vector similarity with
+# stored importance; graph neighbors enter at an attenuated score
+SIM_WEIGHT = 0.7
+IMP_WEIGHT = 0.3
+NEIGHBOR_ATTENUATION = 0.6
+
+
+if _HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _prune_scores(imp, ts, acc, now, decay):
+        """Fused, SIMD-parallel decay scoring (no temporary arrays)"""
+        n = imp.shape[0]
+        out = np.empty(n, np.float32)
+        for i in prange(n):
+            age_days = (now - ts[i]) / 86400.0
+            out[i] = imp[i] * decay ** age_days + min(acc[i] * 0.1, 0.5)
+        return out
+else:
+    def _prune_scores(imp, ts, acc, now, decay):
+        """NumPy fallback for the decay scoring when numba is absent"""
+        age_days = (now - ts) / 86400.0
+        scores = imp * np.power(decay, age_days) + np.minimum(acc * 0.1, 0.5)
+        return scores.astype(np.float32, copy=False)
+
+
+def _grow(arr: np.ndarray) -> np.ndarray:
+    """Double the length of a 1-D bookkeeping array, preserving contents"""
+    grown = np.zeros(arr.shape[0] * 2, dtype=arr.dtype)
+    grown[:arr.shape[0]] = arr
+    return grown
+
+
+def _lists_to_csr(lists: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Flatten adjacency lists into CSR indptr/indices arrays"""
+    indptr = np.zeros(len(lists) + 1, dtype=np.int32)
+    for i, adjacent in enumerate(lists):
+        indptr[i + 1] = indptr[i] + len(adjacent)
+    indices = np.fromiter(
+        (idx for adjacent in lists for idx in adjacent),
+        dtype=np.int32, count=int(indptr[-1])
+    )
+    return indptr, indices
 
-@dataclass
+
+def _csr_to_lists(indptr: np.ndarray, indices: np.ndarray) -> List[List[int]]:
+    """Expand CSR indptr/indices arrays back into adjacency lists"""
+    return [
+        [int(idx) for idx in indices[indptr[i]:indptr[i + 1]]]
+        for i in range(len(indptr) - 1)
+    ]
+
+
+@dataclass(slots=True)
 class MemoryNode:
-    """Represents a single episodic memory node in the graph"""
-    
+    """Represents a single episodic memory node in the graph
+
+    The embedding lives in the owning memory's shared float32 matrix;
+    the node only stores its row index (SoA layout, one allocation for
+    all embeddings instead of one ndarray per node). Slots and a lazily
+    allocated metadata dict keep the per-node footprint small at
+    100k-node capacities. Readers should use ``node.metadata or {}``.
+    """
+
     node_id: str
-    timestamp: datetime
+    timestamp_s: float  # epoch seconds; cheap to store and compare
     content: str
-    embedding: np.ndarray
+    emb_row: int
     modality: str  # text, image, audio, video, multimodal
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    metadata: Optional[Dict[str, Any]] = None
     emotional_valence: float = 0.0  # -1 (negative) to +1 (positive)
     importance: float = 0.5  # 0 to 1
     access_count: int = 0
-    
+    emb_matrix: Optional[np.ndarray] = field(default=None, repr=False)
+
     def __post_init__(self):
         """Validate node structure"""
-        if self.embedding.ndim != 1:
-            raise ValueError("Embedding must be 1-dimensional vector")
         if not 0 <= self.importance <= 1:
             raise ValueError("Importance must be between 0 and 1")
 
+    @property
+    def embedding(self) -> np.ndarray:
+        """View of this node's row in the shared embedding matrix"""
+        return self.emb_matrix[self.emb_row]
+
+    @property
+    def timestamp(self) -> datetime:
+        """Creation time as a datetime, converted on demand"""
+        return datetime.fromtimestamp(self.timestamp_s)
 
-@dataclass
+    def set_meta(self, key: str, value: Any):
+        """Set a metadata entry, allocating the dict on first write"""
+        if self.metadata is None:
+            self.metadata = {}
+        self.metadata[key] = value
+
+
+@dataclass(slots=True)
 class MemoryEdge:
     """Represents a relationship between memory nodes"""
-    
+
     source_id: str
     target_id: str
     edge_type: str  # temporal, semantic, causal, associative
     strength: float = 1.0  # 0 to 1
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    metadata: Optional[Dict[str, Any]] = None
+
+    def as_attr_dict(self) -> Dict[str, Any]:
+        """Shallow field dict (slots classes have no __dict__)"""
+        return {f.name: getattr(self, f.name) for f in fields(self)}
 
 
 class NeuralGraphMemory:
@@ -61,47 +148,158 @@ class NeuralGraphMemory:
     - Real-time incremental updates
     - Multimodal node support
     """
-    
+
+    # Number of embeddings staged before a single batched FAISS add
+    FLUSH_BATCH = 1024
+
     def __init__(
         self,
         embedding_dim: int = 768,
         index_type: str = "IVF",
         memory_capacity: int = 100000,
-        decay_rate: float = 0.95
+        decay_rate: float = 0.95,
+        use_gpu: bool = False,
+        metric: str = "ip"
     ):
         """
         Initialize Neural Graph Memory system
-        
+
         Args:
             embedding_dim: Dimension of memory embeddings
             index_type: FAISS index type (Flat, IVF, HNSW)
             memory_capacity: Maximum number of memory nodes
             decay_rate: Memory importance decay rate over time
+            use_gpu: Offload index search to GPU 0 when available
+            metric: "ip" for cosine on L2-normalized embeddings (the
+                inner product is then the similarity directly), or "l2"
+                for euclidean with the 1/(1+d) conversion
         """
         self.embedding_dim = embedding_dim
+        self.index_type = index_type
         self.memory_capacity = memory_capacity
         self.decay_rate = decay_rate
+        self.metric = metric
         
         # Core graph structure
         self.graph = nx.DiGraph()
         
         # Memory nodes storage
         self.nodes: Dict[str, MemoryNode] = {}
+
+        # Preallocated SoA embedding storage; rows freed by pruning are
+        # recycled through a free-list (memory pool, no per-insert malloc).
+        # +1 row because pruning only triggers once capacity is exceeded.
+        self._emb_matrix = np.empty((memory_capacity + 1, embedding_dim), dtype=np.float32)
+        self._free_rows: List[int] = []
+        self._next_row = 0
         
-        # FAISS index for fast similarity search
-        if index_type == "Flat":
-            self.index = faiss.IndexFlatL2(embedding_dim)
-        elif index_type == "IVF":
-            quantizer = faiss.IndexFlatL2(embedding_dim)
-            self.index = faiss.IndexIVFFlat(quantizer, embedding_dim, 100)
+        # Optional GPU resources (~10x search throughput for batched queries)
+        self._res = None
+        if use_gpu and faiss.get_num_gpus() > 0:
+            self._res = faiss.StandardGpuResources()
+
+        # FAISS index for fast similarity search, wrapped so vectors are
+        # keyed by our bookkeeping index rather than by insertion row --
+        # search returns those ids directly and pruned vectors can be
+        # dropped with remove_ids instead of lingering as stale entries
+        self._min_train_points = 0  # set by _build_index for IVF
+        inner = self._build_index()
+        if inner.is_trained:
+            self.index = faiss.IndexIDMap2(inner)
+            self._bootstrapping = False
         else:
-            self.index = faiss.IndexHNSWFlat(embedding_dim, 32)
-        
-        # Mapping from FAISS index to node IDs
-        self.index_to_node_id: List[str] = []
-        
+            # Indexes that need training (IVF) start on an exact flat
+            # index; flush() promotes to the target index once enough
+            # vectors have accumulated to train the quantizer
+            self.index = faiss.IndexIDMap2(self._flat_index())
+            self._bootstrapping = True
+
+        # Monotonic counter for unique node ids; avoids a clock read and
+        # stays unique even after pruning shrinks the node count
+        self._next_id = 0
+
+        # Insertion order doubles as temporal order (timestamps are
+        # monotonic at insert time); removed nodes leave None tombstones
+        # so positions stay stable
+        self._insertion_order: List[Optional[str]] = []
+        self._node_to_pos: Dict[str, int] = {}
+
+        # Integer adjacency lists indexed by insertion order; neighbor fetch
+        # is a list index instead of networkx dict-of-dict traversal
+        self._node_idx: Dict[str, int] = {}
+        self._succ_lists: List[List[int]] = []
+        self._pred_lists: List[List[int]] = []
+
+        # Per-row candidate attributes aligned with FAISS rows, so
+        # retrieval filters/scores run as NumPy masks instead of a
+        # Python loop; modalities are interned to small ints
+        self._importance_arr = np.zeros(memory_capacity + 1, dtype=np.float32)
+        self._valence_arr = np.zeros(memory_capacity + 1, dtype=np.float32)
+        self._modality_arr = np.zeros(memory_capacity + 1, dtype=np.int32)
+        self._timestamp_arr = np.zeros(memory_capacity + 1, dtype=np.float64)
+        self._access_arr = np.zeros(memory_capacity + 1, dtype=np.int32)
+        self._modality_codes: Dict[str, int] = {}
+
+        # Epoch-stamped dedup buffer for neighbor merging: a membership
+        # test is one integer compare instead of hashing a long node-id
+        # string, and bumping the epoch resets it without a fill
+        self._seen_epoch = np.zeros(memory_capacity + 1, dtype=np.int64)
+        self._epoch = 0
+
+        # Staging buffer for batched FAISS inserts (amortizes Python->C
+        # transitions and lets BLAS kernels operate on contiguous rows)
+        self._pending = np.empty((self.FLUSH_BATCH, embedding_dim), dtype=np.float32)
+        self._pending_ids: List[str] = []
+
         logger.info(f"Initialized NGM with {embedding_dim}D embeddings, {index_type} index")
-    
+
+    def _build_index(self):
+        """Construct a fresh FAISS index for the configured type and metric"""
+        faiss_metric = (
+            faiss.METRIC_INNER_PRODUCT if self.metric == "ip" else faiss.METRIC_L2
+        )
+
+        if self.index_type == "Flat":
+            index = self._flat_index()
+        elif self.index_type == "IVF":
+            # IVFPQ stores PQ codes (one byte per subquantizer) instead
+            # of full float32 vectors (~96x smaller at dim=768); nlist
+            # scales with capacity but is capped at the staging batch
+            # size so one full flush is always enough to train the
+            # quantizer (kmeans needs at least nlist points, PQ at
+            # least 256)
+            nlist = max(100, min(int(4 * math.sqrt(self.memory_capacity)), self.FLUSH_BATCH))
+            # PQ splits vectors into m equal subspaces, so m must divide
+            # the dimension: use the largest divisor <= 32, keeping the
+            # vectors uncompressed when none exists (e.g. prime dims)
+            m = next(m for m in range(32, 0, -1) if self.embedding_dim % m == 0)
+            if m > 1:
+                storage = f"PQ{m}"
+            else:
+                logger.warning(
+                    f"embedding_dim={self.embedding_dim} has no PQ-compatible "
+                    f"divisor <= 32; storing uncompressed IVF vectors"
+                )
+                storage = "Flat"
+            index = faiss.index_factory(
+                self.embedding_dim, f"IVF{nlist},{storage}", faiss_metric
+            )
+            index.nprobe = max(8, nlist // 64)
+            self._min_train_points = max(256, nlist)
+        else:
+            index = faiss.IndexHNSWFlat(self.embedding_dim, 32, faiss_metric)
+
+        if self._res is not None:
+            index = faiss.index_cpu_to_gpu(self._res, 0, index)
+
+        return index
+
+    def _flat_index(self):
+        """Exact flat index matching the configured metric"""
+        if self.metric == "ip":
+            return faiss.IndexFlatIP(self.embedding_dim)
+        return faiss.IndexFlatL2(self.embedding_dim)
+
     def add_memory(
         self,
         content: str,
@@ -127,30 +325,78 @@ class NeuralGraphMemory:
         Returns:
             node_id: Unique identifier for the created memory node
         """
+        if embedding.ndim != 1:
+            raise ValueError("Embedding must be 1-dimensional vector")
+
         # Generate unique node ID
-        node_id = f"mem_{len(self.nodes)}_{datetime.now().timestamp()}"
-        
+        node_id = f"mem_{self._next_id}"
+        self._next_id += 1
+
+        # Write embedding into the shared matrix, recycling freed rows
+        if self._free_rows:
+            emb_row = self._free_rows.pop()
+        else:
+            emb_row = self._next_row
+            self._next_row += 1
+        # Assigning into the row converts dtype during the write itself;
+        # no intermediate astype copy of the incoming vector
+        self._emb_matrix[emb_row] = embedding
+        if self.metric == "ip":
+            # L2-normalize in place so inner product equals cosine
+            faiss.normalize_L2(self._emb_matrix[emb_row:emb_row + 1])
+
         # Create memory node
         node = MemoryNode(
             node_id=node_id,
-            timestamp=datetime.now(),
+            timestamp_s=time.time(),
             content=content,
-            embedding=embedding.astype('float32'),
+            emb_row=emb_row,
             modality=modality,
-            metadata=metadata or {},
+            metadata=metadata,
             emotional_valence=emotional_valence,
-            importance=importance
+            importance=importance,
+            emb_matrix=self._emb_matrix
         )
         
         # Add to node storage
         self.nodes[node_id] = node
-        
+
+        # Register in the integer adjacency structure
+        idx = len(self._succ_lists)
+        self._node_idx[node_id] = idx
+        self._succ_lists.append([])
+        self._pred_lists.append([])
+
+        # Record per-row attributes for vectorized retrieval
+        if idx >= self._importance_arr.shape[0]:
+            self._importance_arr = _grow(self._importance_arr)
+            self._valence_arr = _grow(self._valence_arr)
+            self._modality_arr = _grow(self._modality_arr)
+            self._timestamp_arr = _grow(self._timestamp_arr)
+            self._access_arr = _grow(self._access_arr)
+            self._seen_epoch = _grow(self._seen_epoch)
+        self._importance_arr[idx] = importance
+        self._valence_arr[idx] = emotional_valence
+        self._modality_arr[idx] = self._modality_code(modality)
+        self._timestamp_arr[idx] = node.timestamp_s
+        self._access_arr[idx] = 0
+
+        # Track temporal position
+        self._insertion_order.append(node_id)
+        self._node_to_pos[node_id] = len(self._insertion_order) - 1
+
         # Add to graph
-        self.graph.add_node(node_id, **node.__dict__)
+        # Only the modality is mirrored into the graph; duplicating every
+        # field (including the embedding) into networkx attribute dicts
+        # would triple per-node memory for data already held elsewhere
+        self.graph.add_node(node_id, modality=modality)
         
-        # Add to FAISS index
-        self.index.add(embedding.reshape(1, -1).astype('float32'))
-        self.index_to_node_id.append(node_id)
+        # Stage for batched FAISS insertion (copy straight from the
+        # matrix row; the staging buffer is the only extra copy)
+        self._pending[len(self._pending_ids)] = self._emb_matrix[emb_row]
+        self._pending_ids.append(node_id)
+        if len(self._pending_ids) >= self.FLUSH_BATCH:
+            self.flush()
         
         # Create edges to parent nodes
         if parent_node_ids:
@@ -162,8 +408,9 @@ class NeuralGraphMemory:
                         edge_type="causal",
                         strength=0.8
                     )
-                    self.graph.add_edge(parent_id, node_id, **edge.__dict__)
-        
+                    self.graph.add_edge(parent_id, node_id, **edge.as_attr_dict())
+                    self._link(parent_id, node_id)
+
         # Create temporal edges to recent memories
         self._create_temporal_edges(node_id)
         
@@ -173,7 +420,53 @@ class NeuralGraphMemory:
         
         logger.debug(f"Added memory node {node_id} [{modality}]")
         return node_id
-    
+
+    def flush(self):
+        """Flush staged embeddings into the FAISS index in a single batched add"""
+        if not self._pending_ids:
+            return
+
+        batch = self._pending[:len(self._pending_ids)]
+        batch_ids = np.fromiter(
+            (self._node_idx[node_id] for node_id in self._pending_ids),
+            dtype=np.int64, count=len(self._pending_ids)
+        )
+        self.index.add_with_ids(batch, batch_ids)
+        self._pending_ids = []
+
+        # Once the bootstrap flat index holds enough vectors, train the
+        # target index on them and swap it in
+        if self._bootstrapping and self.index.ntotal >= self._min_train_points:
+            self._promote_index()
+
+    def _promote_index(self):
+        """Swap the bootstrap flat index for the trained target index"""
+        self._bootstrapping = False
+        self._rebuild_index()
+        logger.info(f"Trained {self.index_type} index on {self.index.ntotal} vectors")
+
+    def _rebuild_index(self):
+        """Rebuild the index from live vectors only, discarding stale entries"""
+        live_ids = [nid for nid in self._insertion_order if nid is not None]
+        ids = np.fromiter(
+            (self._node_idx[nid] for nid in live_ids),
+            dtype=np.int64, count=len(live_ids)
+        )
+        emb_rows = np.fromiter(
+            (self.nodes[nid].emb_row for nid in live_ids),
+            dtype=np.int64, count=len(live_ids)
+        )
+        vectors = np.ascontiguousarray(self._emb_matrix[emb_rows])
+
+        # While bootstrapping there may be too few vectors to train the
+        # target index, so rebuild onto a fresh flat index instead
+        inner = self._flat_index() if self._bootstrapping else self._build_index()
+        if not inner.is_trained:
+            inner.train(vectors)
+        index = faiss.IndexIDMap2(inner)
+        index.add_with_ids(vectors, ids)
+        self.index = index
+
     def retrieve(
         self,
         query_embedding: np.ndarray,
@@ -184,139 +477,296 @@ class NeuralGraphMemory:
     ) -> List[Tuple[MemoryNode, float]]:
         """
         Retrieve relevant memories using similarity search and graph traversal
-        
+
         Args:
             query_embedding: Query vector for similarity matching
             top_k: Number of memories to retrieve
             modality_filter: Filter by content type (text, image, etc.)
             min_importance: Minimum importance threshold
             include_neighbors: Whether to include graph neighbors
-            
+
         Returns:
             List of (MemoryNode, similarity_score) tuples
         """
+        return self.retrieve_batch(
+            query_embedding.reshape(1, -1),
+            top_k=top_k,
+            modality_filter=modality_filter,
+            min_importance=min_importance,
+            include_neighbors=include_neighbors
+        )[0]
+
+    def retrieve_batch(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = 5,
+        modality_filter: Optional[str] = None,
+        min_importance: float = 0.0,
+        include_neighbors: bool = True
+    ) -> List[List[Tuple[MemoryNode, float]]]:
+        """
+        Retrieve memories for a batch of queries with a single FAISS search
+
+        FAISS parallelizes batched queries across threads, so issuing B
+        queries at once is far cheaper than B single-query searches.
+
+        Args:
+            query_embeddings: (B, embedding_dim) matrix of query vectors
+            top_k: Number of memories to retrieve per query
+            modality_filter: Filter by content type (text, image, etc.)
+            min_importance: Minimum importance threshold
+            include_neighbors: Whether to include graph neighbors
+
+        Returns:
+            One list of (MemoryNode, similarity_score) tuples per query
+        """
+        n_queries = len(query_embeddings)
         if len(self.nodes) == 0:
-            return []
-        
-        # Perform FAISS similarity search
-        query = query_embedding.reshape(1, -1).astype('float32')
-        distances, indices = self.index.search(query, min(top_k * 3, len(self.nodes)))
-        
-        # Get candidate memories
-        candidates = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx == -1:
-                continue
-            
-            node_id = self.index_to_node_id[idx]
-            node = self.nodes[node_id]
-            
-            # Apply filters
-            if modality_filter and node.modality != modality_filter:
-                continue
-            if node.importance < min_importance:
-                continue
-            
-            # Convert distance to similarity score
-            similarity = 1.0 / (1.0 + dist)
-            candidates.append((node, similarity))
-        
+            return [[] for _ in range(n_queries)]
+
+        # Ensure staged embeddings are searchable
+        self.flush()
+
+        # Perform one multi-query FAISS similarity search
+        queries = np.array(query_embeddings, dtype=np.float32)
+        if self.metric == "ip":
+            faiss.normalize_L2(queries)
+        distances, indices = self.index.search(queries, min(top_k * 3, len(self.nodes)))
+
+        return [
+            self._rank_candidates(
+                distances[row], indices[row],
+                top_k, modality_filter, min_importance, include_neighbors
+            )
+            for row in range(n_queries)
+        ]
+
+    def _rank_candidates(
+        self,
+        cand_dist: np.ndarray,
+        cand_idx: np.ndarray,
+        top_k: int,
+        modality_filter: Optional[str],
+        min_importance: float,
+        include_neighbors: bool
+    ) -> List[Tuple[MemoryNode, float]]:
+        """Filter, score and rank one query's FAISS candidates"""
+        # Filter and score candidates as vectorized masks; only the final
+        # top-k materializes Python MemoryNode objects. FAISS returns our
+        # bookkeeping indices directly thanks to the IDMap wrapper.
+        valid = cand_idx != -1
+        attr_idx = cand_idx[valid]
+        cand_dist = cand_dist[valid]
+
+        # With inner product on normalized vectors the score already is
+        # the cosine similarity; L2 distances still need converting
+        if self.metric == "ip":
+            similarities = cand_dist
+        else:
+            similarities = 1.0 / (1.0 + cand_dist)
+        importances = self._importance_arr[attr_idx]
+
+        # Apply filters
+        mask = importances >= min_importance
+        if modality_filter:
+            mod_code = self._modality_codes.get(modality_filter, -1)
+            mask &= self._modality_arr[attr_idx] == mod_code
+
+        attr_idx = attr_idx[mask]
+        similarities = similarities[mask]
+
         # Sort by combined score (similarity + importance)
-        candidates.sort(
-            key=lambda x: x[1] * 0.7 + x[0].importance * 0.3,
-            reverse=True
-        )
-        
-        # Take top-k
-        results = candidates[:top_k]
-        
+        combined = similarities * SIM_WEIGHT + importances[mask] * IMP_WEIGHT
+        order = np.argsort(-combined)[:top_k]
+
+        results = []
+        for j in order:
+            node_id = self._insertion_order[attr_idx[j]]
+            node = self.nodes.get(node_id) if node_id is not None else None
+            if node is not None:
+                results.append((node, float(similarities[j])))
+
         # Include graph neighbors if requested
         if include_neighbors:
             neighbor_nodes = []
             for node, score in results:
-                # Get both predecessors and successors
-                predecessors = list(self.graph.predecessors(node.node_id))
-                successors = list(self.graph.successors(node.node_id))
-                
-                for neighbor_id in predecessors + successors:
-                    neighbor = self.nodes[neighbor_id]
+                # Get both predecessors and successors via integer adjacency
+                idx = self._node_idx[node.node_id]
+                for neighbor_idx in self._succ_lists[idx] + self._pred_lists[idx]:
+                    neighbor_id = self._insertion_order[neighbor_idx]
+                    neighbor = self.nodes.get(neighbor_id) if neighbor_id else None
+                    if neighbor is None:  # neighbor was pruned
+                        continue
                     # Neighbor score is attenuated
-                    neighbor_score = score * 0.6
+                    neighbor_score = score * NEIGHBOR_ATTENUATION
                     neighbor_nodes.append((neighbor, neighbor_score))
-            
-            # Merge and deduplicate
-            all_results = results + neighbor_nodes
-            seen = set()
+
+            # Merge and deduplicate against the epoch-stamped buffer
+            self._epoch += 1
+            epoch = self._epoch
             unique_results = []
-            for node, score in all_results:
-                if node.node_id not in seen:
-                    seen.add(node.node_id)
+            for node, score in results + neighbor_nodes:
+                idx = self._node_idx[node.node_id]
+                if self._seen_epoch[idx] != epoch:
+                    self._seen_epoch[idx] = epoch
                     unique_results.append((node, score))
-            
-            results = sorted(unique_results, key=lambda x: x[1], reverse=True)[:top_k]
-        
-        # Update access counts
+
+            results = sorted(unique_results, key=itemgetter(1), reverse=True)[:top_k]
+
+        # Update access counts (node field and SoA array stay in sync)
         for node, _ in results:
             node.access_count += 1
-        
+            self._access_arr[self._node_idx[node.node_id]] += 1
+
         return results
     
     def _create_temporal_edges(self, node_id: str, lookback: int = 5):
         """Create temporal edges to recent memories"""
         if len(self.nodes) <= 1:
             return
-        
-        recent_nodes = sorted(
-            self.nodes.values(),
-            key=lambda n: n.timestamp,
-            reverse=True
-        )[1:lookback+1]
-        
-        for recent_node in recent_nodes:
-            if recent_node.node_id != node_id:
+
+        # The most recent memories are simply the tail of the insertion
+        # order (excluding the node itself, appended last)
+        recent_ids = self._insertion_order[-(lookback + 1):-1]
+
+        for recent_id in recent_ids:
+            if recent_id is not None and recent_id != node_id and recent_id in self.nodes:
                 edge = MemoryEdge(
-                    source_id=recent_node.node_id,
+                    source_id=recent_id,
                     target_id=node_id,
                     edge_type="temporal",
                     strength=0.5
                 )
-                self.graph.add_edge(recent_node.node_id, node_id, **edge.__dict__)
-    
+                self.graph.add_edge(recent_id, node_id, **edge.as_attr_dict())
+                self._link(recent_id, node_id)
+
+    def _modality_code(self, modality: str) -> int:
+        """Intern a modality string to a small integer code"""
+        code = self._modality_codes.get(modality)
+        if code is None:
+            code = len(self._modality_codes)
+            self._modality_codes[modality] = code
+        return code
+
+    def _link(self, source_id: str, target_id: str):
+        """Record an edge in the integer adjacency lists"""
+        source_idx = self._node_idx[source_id]
+        target_idx = self._node_idx[target_id]
+        self._succ_lists[source_idx].append(target_idx)
+        self._pred_lists[target_idx].append(source_idx)
+
+
+    def _live_indices(self) -> np.ndarray:
+        """Bookkeeping indices of live (non-pruned) nodes"""
+        return np.fromiter(
+            (i for i, nid in enumerate(self._insertion_order) if nid is not None),
+            dtype=np.int64
+        )
+
     def _prune_memories(self):
         """Remove least important memories to maintain capacity"""
-        # Calculate combined score for each memory
-        scores = []
-        for node_id, node in self.nodes.items():
-            # Decay importance over time
-            age_days = (datetime.now() - node.timestamp).days
-            decayed_importance = node.importance * (self.decay_rate ** age_days)
-            
-            # Factor in access frequency
-            access_boost = min(node.access_count * 0.1, 0.5)
-            
-            total_score = decayed_importance + access_boost
-            scores.append((node_id, total_score))
-        
-        # Sort by score and remove lowest
-        scores.sort(key=lambda x: x[1])
-        to_remove = scores[:len(scores) // 10]  # Remove bottom 10%
-        
-        for node_id, _ in to_remove:
-            self._remove_node(node_id)
-        
-        logger.info(f"Pruned {len(to_remove)} memories")
+        # Flush so every node to be pruned is actually in the index
+        self.flush()
+
+        n = len(self._insertion_order)
+
+        # Score all rows in one pass: time-decayed importance plus a
+        # capped access-frequency boost (JIT-compiled when numba is
+        # installed, vectorized NumPy otherwise)
+        total_score = _prune_scores(
+            self._importance_arr[:n],
+            self._timestamp_arr[:n],
+            self._access_arr[:n],
+            time.time(),
+            self.decay_rate
+        )
+
+        # Select the bottom 10% of live rows without a full sort. Always
+        # drop at least one node: prune only runs once capacity is
+        # exceeded, and the embedding pool has exactly one spare row, so
+        # returning empty-handed would overflow it on the next insert
+        live_idx = self._live_indices()
+        k = max(1, live_idx.size // 10)
+
+        worst = live_idx[np.argpartition(total_score[live_idx], k)[:k]]
+        for i in worst:
+            self._remove_node(self._insertion_order[i])
+
+        # Drop the pruned vectors from the index in one batched call.
+        # HNSW and GPU-resident indexes cannot remove vectors; their
+        # stale entries are filtered out during retrieval, and the index
+        # is rebuilt from live vectors once they exceed 20% so they
+        # cannot accumulate without bound. Compaction subsumes both
+        # paths since it rebuilds the index itself.
+        if len(self._insertion_order) > 2 * len(self.nodes):
+            self._compact()
+        elif self.index_type != "HNSW" and self._res is None:
+            self.index.remove_ids(worst.astype(np.int64))
+        elif self.index.ntotal - len(self.nodes) > 0.2 * self.index.ntotal:
+            self._rebuild_index()
+
+        logger.info(f"Pruned {len(worst)} memories")
+
+    def _compact(self):
+        """Renumber live nodes into dense positions, dropping tombstones
+
+        Tombstones keep positions stable between prunes, but under
+        sustained churn they would grow the insertion order, adjacency
+        lists and attribute arrays in proportion to every node ever
+        inserted rather than the live set. Once tombstones outnumber
+        live nodes, rebuild the positional bookkeeping densely; the
+        positions double as FAISS ids, so the index is rebuilt too.
+        """
+        live_ids = [nid for nid in self._insertion_order if nid is not None]
+        old_positions = [self._node_to_pos[nid] for nid in live_ids]
+        remap = {old: new for new, old in enumerate(old_positions)}
+        n_live = len(live_ids)
+
+        old_pos_arr = np.asarray(old_positions, dtype=np.int64)
+        size = max(self.memory_capacity + 1, n_live)
+        for name in (
+            '_importance_arr', '_valence_arr', '_modality_arr',
+            '_timestamp_arr', '_access_arr'
+        ):
+            old_arr = getattr(self, name)
+            arr = np.zeros(size, dtype=old_arr.dtype)
+            arr[:n_live] = old_arr[old_pos_arr]
+            setattr(self, name, arr)
+        self._seen_epoch = np.zeros(size, dtype=np.int64)
+        self._epoch = 0
+
+        # Adjacency entries pointing at dead nodes are dropped outright;
+        # retrieval only had them to skip
+        self._succ_lists = [
+            [remap[t] for t in self._succ_lists[p] if t in remap]
+            for p in old_positions
+        ]
+        self._pred_lists = [
+            [remap[t] for t in self._pred_lists[p] if t in remap]
+            for p in old_positions
+        ]
+
+        self._insertion_order = live_ids
+        self._node_to_pos = {nid: i for i, nid in enumerate(live_ids)}
+        self._node_idx = dict(self._node_to_pos)
+
+        self._rebuild_index()
+        logger.info(f"Compacted bookkeeping to {n_live} live positions")
     
     def _remove_node(self, node_id: str):
         """Remove a memory node and its edges"""
         if node_id in self.nodes:
             # Remove from graph
             self.graph.remove_node(node_id)
-            
-            # Remove from nodes dict
-            del self.nodes[node_id]
-            
-            # Note: FAISS index is not updated (costly operation)
-            # Stale indices are filtered during retrieval
+
+            # Remove from nodes dict, recycling its embedding row
+            node = self.nodes.pop(node_id)
+            self._free_rows.append(node.emb_row)
+
+            # Tombstone the temporal position (no shifting); the FAISS
+            # vector is dropped by the caller via index.remove_ids
+            self._insertion_order[self._node_to_pos.pop(node_id)] = None
+            del self._node_idx[node_id]
     
     def get_context_window(
         self,
@@ -335,82 +785,271 @@ class NeuralGraphMemory:
         """
         if current_node_id not in self.nodes:
             return []
-        
-        current_node = self.nodes[current_node_id]
-        
-        # Get all nodes sorted by timestamp
-        sorted_nodes = sorted(self.nodes.values(), key=lambda n: n.timestamp)
-        
-        # Find current node index
-        current_idx = next(
-            i for i, n in enumerate(sorted_nodes)
-            if n.node_id == current_node_id
-        )
-        
-        # Extract window
+
+        # Insertion order is temporal order: extract the window around
+        # this node's position, skipping tombstones of pruned nodes
+        current_idx = self._node_to_pos[current_node_id]
         start_idx = max(0, current_idx - window_size // 2)
-        end_idx = min(len(sorted_nodes), current_idx + window_size // 2 + 1)
-        
-        return sorted_nodes[start_idx:end_idx]
+        end_idx = min(len(self._insertion_order), current_idx + window_size // 2 + 1)
+
+        return [
+            self.nodes[nid]
+            for nid in self._insertion_order[start_idx:end_idx]
+            if nid is not None
+        ]
     
     def save(self, filepath: str):
-        """Save memory graph to disk"""
-        state = {
-            'nodes': self.nodes,
-            'graph': self.graph,
-            'index_to_node_id': self.index_to_node_id,
+        """
+        Save memory graph to disk in a columnar, schema-explicit format
+
+        Writes three sidecar files instead of one monolithic pickle:
+        - filepath + '.emb.npy': the used rows of the embedding matrix
+        - filepath + '.arrays.npz': bookkeeping arrays and CSR edge arrays
+        - filepath + '.meta.json': node contents/metadata and config
+        plus the FAISS index at filepath + '.faiss' as before.
+        """
+        self.flush()
+
+        n = len(self._insertion_order)
+
+        # Bulk data: one contiguous write per column instead of
+        # per-object pickling
+        np.save(filepath + '.emb.npy', self._emb_matrix[:self._next_row])
+
+        succ_indptr, succ_indices = _lists_to_csr(self._succ_lists)
+        pred_indptr, pred_indices = _lists_to_csr(self._pred_lists)
+
+        # Per-edge attributes aligned with succ_indices: edge types are
+        # interned to small codes like modalities, strengths go in a
+        # float column, and the (rarely populated) metadata dicts in the
+        # JSON sidecar. Edges whose endpoint was pruned get -1 sentinels
+        # and are skipped on load along with the tombstone itself.
+        edge_type_codes: Dict[str, int] = {}
+        edge_types = np.empty(len(succ_indices), dtype=np.int32)
+        edge_strengths = np.zeros(len(succ_indices), dtype=np.float32)
+        edge_metadatas: List[Optional[Dict[str, Any]]] = []
+        e = 0
+        for idx, targets in enumerate(self._succ_lists):
+            source_id = self._insertion_order[idx]
+            for target_idx in targets:
+                target_id = self._insertion_order[target_idx]
+                data = (
+                    self.graph.get_edge_data(source_id, target_id)
+                    if source_id is not None and target_id is not None
+                    else None
+                )
+                if data is None:
+                    edge_types[e] = -1
+                    edge_metadatas.append(None)
+                else:
+                    edge_type = data.get('edge_type', 'associative')
+                    code = edge_type_codes.setdefault(edge_type, len(edge_type_codes))
+                    edge_types[e] = code
+                    edge_strengths[e] = data.get('strength', 1.0)
+                    edge_metadatas.append(data.get('metadata'))
+                e += 1
+
+        np.savez_compressed(
+            filepath + '.arrays.npz',
+            importance=self._importance_arr[:n],
+            valence=self._valence_arr[:n],
+            modality=self._modality_arr[:n],
+            timestamp=self._timestamp_arr[:n],
+            access=self._access_arr[:n],
+            succ_indptr=succ_indptr,
+            succ_indices=succ_indices,
+            pred_indptr=pred_indptr,
+            pred_indices=pred_indices,
+            edge_type=edge_types,
+            edge_strength=edge_strengths,
+            free_rows=np.asarray(self._free_rows, dtype=np.int64)
+        )
+
+        # Per-node strings and metadata, aligned with insertion order
+        # (null entries are tombstones of pruned nodes)
+        meta = {
             'config': {
                 'embedding_dim': self.embedding_dim,
+                'index_type': self.index_type,
                 'memory_capacity': self.memory_capacity,
-                'decay_rate': self.decay_rate
-            }
+                'decay_rate': self.decay_rate,
+                'metric': self.metric
+            },
+            'insertion_order': self._insertion_order,
+            'contents': [
+                self.nodes[nid].content if nid is not None and nid in self.nodes else None
+                for nid in self._insertion_order
+            ],
+            'metadatas': [
+                self.nodes[nid].metadata if nid is not None and nid in self.nodes else None
+                for nid in self._insertion_order
+            ],
+            'emb_rows': [
+                self.nodes[nid].emb_row if nid is not None and nid in self.nodes else -1
+                for nid in self._insertion_order
+            ],
+            'modality_codes': self._modality_codes,
+            'edge_type_codes': edge_type_codes,
+            'edge_metadatas': edge_metadatas,
+            'next_row': self._next_row,
+            'next_id': self._next_id,
+            'bootstrapping': self._bootstrapping,
+            'min_train_points': self._min_train_points
         }
-        
-        with open(filepath, 'wb') as f:
-            pickle.dump(state, f)
-        
-        # Save FAISS index separately
-        faiss.write_index(self.index, filepath + '.faiss')
-        
+        with open(filepath + '.meta.json', 'w') as f:
+            json.dump(meta, f)
+
+        # Save FAISS index separately (GPU indexes must be brought back
+        # to the CPU before serialization)
+        index = self.index
+        if self._res is not None:
+            index = faiss.index_gpu_to_cpu(index)
+        faiss.write_index(index, filepath + '.faiss')
+
         logger.info(f"Saved NGM to {filepath}")
-    
+
     def load(self, filepath: str):
-        """Load memory graph from disk"""
-        with open(filepath, 'rb') as f:
-            state = pickle.load(f)
-        
-        self.nodes = state['nodes']
-        self.graph = state['graph']
-        self.index_to_node_id = state['index_to_node_id']
-        
-        config = state['config']
+        """Load memory graph from disk (see save for the file layout)"""
+        with open(filepath + '.meta.json') as f:
+            meta = json.load(f)
+
+        config = meta['config']
         self.embedding_dim = config['embedding_dim']
+        self.index_type = config['index_type']
         self.memory_capacity = config['memory_capacity']
         self.decay_rate = config['decay_rate']
-        
-        # Load FAISS index
+        self.metric = config['metric']
+
+        arrays = np.load(filepath + '.arrays.npz')
+        n = arrays['importance'].shape[0]
+
+        size = max(self.memory_capacity + 1, n)
+        self._importance_arr = np.zeros(size, dtype=np.float32)
+        self._valence_arr = np.zeros(size, dtype=np.float32)
+        self._modality_arr = np.zeros(size, dtype=np.int32)
+        self._timestamp_arr = np.zeros(size, dtype=np.float64)
+        self._access_arr = np.zeros(size, dtype=np.int32)
+        self._importance_arr[:n] = arrays['importance']
+        self._valence_arr[:n] = arrays['valence']
+        self._modality_arr[:n] = arrays['modality']
+        self._timestamp_arr[:n] = arrays['timestamp']
+        self._access_arr[:n] = arrays['access']
+
+        # The dedup and staging buffers are sized from the loaded config,
+        # which may differ from what the constructor was given
+        self._seen_epoch = np.zeros(size, dtype=np.int64)
+        self._epoch = 0
+        self._pending = np.empty((self.FLUSH_BATCH, self.embedding_dim), dtype=np.float32)
+
+        # Stream embeddings from the memory-mapped file into the
+        # preallocated pool (one contiguous copy, no per-object decode)
+        emb = np.load(filepath + '.emb.npy', mmap_mode='r')
+        self._next_row = meta['next_row']
+        self._emb_matrix = np.empty(
+            (max(self.memory_capacity + 1, self._next_row), self.embedding_dim),
+            dtype=np.float32
+        )
+        self._emb_matrix[:self._next_row] = emb
+        self._free_rows = [int(r) for r in arrays['free_rows']]
+
+        # Rebuild adjacency lists from the CSR arrays
+        self._succ_lists = _csr_to_lists(arrays['succ_indptr'], arrays['succ_indices'])
+        self._pred_lists = _csr_to_lists(arrays['pred_indptr'], arrays['pred_indices'])
+
+        self._insertion_order = meta['insertion_order']
+        self._next_id = meta['next_id']
+        self._bootstrapping = meta['bootstrapping']
+        # Restored alongside the config: the constructor's value belongs
+        # to its own index type, which the file may override
+        self._min_train_points = meta['min_train_points']
+        self._modality_codes = {k: int(v) for k, v in meta['modality_codes'].items()}
+        code_to_modality = {v: k for k, v in self._modality_codes.items()}
+
+        # Reconstruct nodes and the graph from the columnar data
+        self.nodes = {}
+        self._node_idx = {}
+        self._node_to_pos = {}
+        self.graph = nx.DiGraph()
+        for idx, node_id in enumerate(self._insertion_order):
+            if node_id is None:
+                continue
+            node = MemoryNode(
+                node_id=node_id,
+                timestamp_s=float(self._timestamp_arr[idx]),
+                content=meta['contents'][idx],
+                emb_row=meta['emb_rows'][idx],
+                modality=code_to_modality[int(self._modality_arr[idx])],
+                metadata=meta['metadatas'][idx],
+                emotional_valence=float(self._valence_arr[idx]),
+                importance=float(self._importance_arr[idx]),
+                access_count=int(self._access_arr[idx]),
+                emb_matrix=self._emb_matrix
+            )
+            self.nodes[node_id] = node
+            self._node_idx[node_id] = idx
+            self._node_to_pos[node_id] = idx
+            self.graph.add_node(node_id, modality=node.modality)
+
+        # Rebuild graph edges with their persisted attributes; the edge
+        # columns are aligned with succ_indices, so the running counter
+        # advances over tombstoned entries too
+        code_to_edge_type = {int(v): k for k, v in meta['edge_type_codes'].items()}
+        edge_types = arrays['edge_type']
+        edge_strengths = arrays['edge_strength']
+        edge_metadatas = meta['edge_metadatas']
+        e = 0
+        for idx, targets in enumerate(self._succ_lists):
+            source_id = self._insertion_order[idx]
+            for target_idx in targets:
+                target_id = self._insertion_order[target_idx]
+                if source_id is not None and target_id is not None and edge_types[e] >= 0:
+                    edge = MemoryEdge(
+                        source_id=source_id,
+                        target_id=target_id,
+                        edge_type=code_to_edge_type[int(edge_types[e])],
+                        strength=float(edge_strengths[e]),
+                        metadata=edge_metadatas[e]
+                    )
+                    self.graph.add_edge(source_id, target_id, **edge.as_attr_dict())
+                e += 1
+
+        self._pending_ids = []
+
+        # Load FAISS index, moving it back onto the GPU if available
         self.index = faiss.read_index(filepath + '.faiss')
-        
+        if self._res is not None:
+            self.index = faiss.index_cpu_to_gpu(self._res, 0, self.index)
+
         logger.info(f"Loaded NGM from {filepath} ({len(self.nodes)} nodes)")
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get memory system statistics"""
+        self.flush()
+
+        # Average over live rows only; pruned nodes keep their array
+        # slots but must not skew the statistics
+        live = self._live_indices()
         return {
             'total_nodes': len(self.nodes),
             'total_edges': self.graph.number_of_edges(),
             'modality_distribution': self._get_modality_distribution(),
-            'avg_importance': np.mean([n.importance for n in self.nodes.values()]),
-            'avg_emotional_valence': np.mean([n.emotional_valence for n in self.nodes.values()]),
+            'avg_importance': float(self._importance_arr[live].mean()) if live.size else 0.0,
+            'avg_emotional_valence': float(self._valence_arr[live].mean()) if live.size else 0.0,
             'graph_density': nx.density(self.graph),
             'avg_degree': sum(dict(self.graph.degree()).values()) / len(self.graph) if len(self.graph) > 0 else 0
         }
-    
+
     def _get_modality_distribution(self) -> Dict[str, int]:
-        """Get count of memories by modality"""
-        distribution = {}
-        for node in self.nodes.values():
-            distribution[node.modality] = distribution.get(node.modality, 0) + 1
-        return distribution
+        """Get count of live memories by modality"""
+        counts = np.bincount(
+            self._modality_arr[self._live_indices()],
+            minlength=len(self._modality_codes)
+        )
+        return {
+            modality: int(counts[code])
+            for modality, code in self._modality_codes.items()
+            if counts[code] > 0
+        }
 
 
 class LPG2VecEncoder:
@@ -437,7 +1076,7 @@ class LPG2VecEncoder:
         base_embedding = node.embedding
         
         # Temporal features
-        age_seconds = (datetime.now() - node.timestamp).total_seconds()
+        age_seconds = time.time() - node.timestamp_s
         temporal_features = np.array([
             np.log1p(age_seconds),  # Log-scaled age
             node.access_count / 100.0  # Normalized access count
@@ -470,19 +1109,59 @@ class LPG2VecEncoder:
             node_features: (N, embedding_dim) array
             edge_index: (2, E) array of edge connections
         """
-        # Encode all nodes
         node_ids = list(nodes.keys())
-        node_features = np.array([
-            self.encode_node(nodes[nid]) for nid in node_ids
-        ])
-        
+        nodes_list = [nodes[nid] for nid in node_ids]
+        n = len(nodes_list)
+
+        if n == 0:
+            return (
+                np.zeros((0, self.embedding_dim), dtype=np.float32),
+                np.zeros((2, 0), dtype=int)
+            )
+
+        # Encode all nodes in one pass: content embeddings fill the head
+        # columns, temporal/affect features the last four (matches encode_node)
+        tail_start = self.embedding_dim - 4
+        node_features = np.zeros((n, self.embedding_dim), dtype=np.float32)
+
+        stacked = np.stack([node.embedding for node in nodes_list])
+        width = min(tail_start, stacked.shape[1])
+        node_features[:, :width] = stacked[:, :width]
+
+        now_ts = time.time()
+        timestamps = np.fromiter(
+            (node.timestamp_s for node in nodes_list),
+            dtype=np.float64, count=n
+        )
+        access_counts = np.fromiter(
+            (node.access_count for node in nodes_list),
+            dtype=np.float64, count=n
+        )
+        node_features[:, -4] = np.log1p(now_ts - timestamps)
+        node_features[:, -3] = access_counts / 100.0
+        node_features[:, -2] = np.fromiter(
+            (node.emotional_valence for node in nodes_list),
+            dtype=np.float64, count=n
+        )
+        node_features[:, -1] = np.fromiter(
+            (node.importance for node in nodes_list),
+            dtype=np.float64, count=n
+        )
+
         # Build edge index
         node_id_to_idx = {nid: idx for idx, nid in enumerate(node_ids)}
-        edges = []
-        for source, target in graph.edges():
-            if source in node_id_to_idx and target in node_id_to_idx:
-                edges.append([node_id_to_idx[source], node_id_to_idx[target]])
-        
-        edge_index = np.array(edges).T if edges else np.zeros((2, 0), dtype=int)
-        
+        edge_flat = np.fromiter(
+            (
+                idx
+                for source, target in graph.edges()
+                if source in node_id_to_idx and target in node_id_to_idx
+                for idx in (node_id_to_idx[source], node_id_to_idx[target])
+            ),
+            dtype=int
+        )
+        edge_index = (
+            edge_flat.reshape(-1, 2).T if edge_flat.size
+            else np.zeros((2, 0), dtype=int)
+        )
+
         return node_features, edge_index